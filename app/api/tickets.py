@@ -1,18 +1,22 @@
 """REST API endpoints for ticket management"""
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi_cache import FastAPICache
+from fastapi_cache.decorator import cache
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Callable, Dict, Optional, Tuple
 from uuid import UUID
-from datetime import datetime
 import logging
 
-from app.database import get_db
+from app.database import get_db, get_db_ro
 from app.models import Ticket, TicketStatus, TicketUrgency, TicketCategory
 from app.schemas import (
-    TicketCreate, TicketCreateResponse, TicketResponse, 
-    TicketListResponse, TicketUpdate, TicketResolve
+    TicketCreate, TicketCreateResponse, TicketResponse,
+    TicketUpdate, TicketResolve,
+    TICKET_ADAPTER, TICKET_LIST_ADAPTER
 )
+from app.utils.redis_client import get_async_redis, ticket_cache_key
 from app.workers.celery_worker import process_ticket_task
 
 logger = logging.getLogger(__name__)
@@ -20,16 +24,50 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/tickets", tags=["tickets"])
 
 
+def query_key_builder(
+    func: Callable[..., Any],
+    namespace: str = "",
+    *,
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: Tuple[Any, ...] = (),
+    kwargs: Dict[str, Any] = None,
+) -> str:
+    """
+    Build cache keys from the request path and query string only.
+
+    The default key builder hashes endpoint kwargs, which include the
+    database session object and would never produce a cache hit.
+    """
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.items()))
+    return f"{namespace}:{request.url.path}?{query}"
+
+
+# Single-ticket cache: agents poll GET /tickets/{id} while a ticket is
+# being processed, so cached hits skip the DB round-trip entirely. The
+# Celery workers delete the key on every status write, so the TTL only
+# bounds staleness if an invalidation is lost.
+TICKET_CACHE_TTL = 60
+
+
+async def invalidate_ticket_caches(ticket_id: UUID = None):
+    """Clear cached list/stats responses (and, if given, one cached ticket)
+    after a ticket mutation"""
+    await FastAPICache.clear(namespace="tickets")
+    if ticket_id is not None:
+        await get_async_redis().delete(ticket_cache_key(ticket_id))
+
+
 @router.post("/", response_model=TicketCreateResponse, status_code=201)
 async def create_ticket(
     ticket_data: TicketCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new ticket and queue it for AI processing.
-    
+
     **CRITICAL: This endpoint returns immediately (< 200ms) without waiting for AI processing.**
-    
+
     The ticket is created with status='pending' and a background worker picks it up
     for AI analysis (which takes 3-5 seconds).
     """
@@ -43,43 +81,49 @@ async def create_ticket(
             status=TicketStatus.PENDING,
             processing_attempts=0
         )
-        
+
         db.add(ticket)
-        db.commit()
-        db.refresh(ticket)
-        
-        logger.info(f"✅ Created ticket {ticket.id} with status PENDING")
-        
+        await db.commit()
+        await db.refresh(ticket)
+
+        await invalidate_ticket_caches()
+
+        logger.info("✅ Created ticket %s with status PENDING", ticket.id)
+
         # Queue background task for AI processing (NON-BLOCKING)
         process_ticket_task.delay(str(ticket.id))
-        
-        logger.info(f"📤 Queued ticket {ticket.id} for background processing")
-        
+
+        logger.debug("📤 Queued ticket %s for background processing", ticket.id)
+
         # Return immediately without waiting for AI processing
         return TicketCreateResponse(
             id=ticket.id,
             status=ticket.status,
             message="Ticket created successfully and queued for processing"
         )
-        
+
     except Exception as e:
-        logger.error(f"Error creating ticket: {e}")
-        db.rollback()
+        logger.error("Error creating ticket: %s", e)
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating ticket: {str(e)}")
 
 
-@router.get("/", response_model=TicketListResponse)
+# No response_model: the page is serialized once through the precompiled
+# TICKET_LIST_ADAPTER (shape: TicketListResponse) so FastAPI does not
+# re-validate up to 500 rows per call
+@router.get("/")
+@cache(expire=15, namespace="tickets", key_builder=query_key_builder)
 async def list_tickets(
     status: Optional[TicketStatus] = Query(None, description="Filter by status"),
     urgency: Optional[TicketUrgency] = Query(None, description="Filter by urgency"),
     category: Optional[TicketCategory] = Query(None, description="Filter by category"),
     limit: int = Query(100, ge=1, le=500, description="Maximum number of results"),
     offset: int = Query(0, ge=0, description="Number of results to skip"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db_ro)
 ):
     """
     Get a list of tickets with optional filters.
-    
+
     - **status**: Filter by ticket status (pending, processing, ready, resolved, failed)
     - **urgency**: Filter by urgency level (high, medium, low)
     - **category**: Filter by category (billing, technical, feature_request)
@@ -87,188 +131,241 @@ async def list_tickets(
     - **offset**: Number of results to skip for pagination (default: 0)
     """
     try:
-        # Build query
-        query = db.query(Ticket)
-        
-        # Apply filters
+        # Build filters once; COUNT(*) OVER () returns the total alongside
+        # the page so we avoid a separate COUNT(*) round-trip
+        filters = []
         if status:
-            query = query.filter(Ticket.status == status)
+            filters.append(Ticket.status == status)
         if urgency:
-            query = query.filter(Ticket.urgency == urgency)
+            filters.append(Ticket.urgency == urgency)
         if category:
-            query = query.filter(Ticket.category == category)
-        
-        # Get total count
-        total = query.count()
-        
-        # Apply pagination and ordering
-        tickets = query.order_by(
-            Ticket.created_at.desc()
-        ).limit(limit).offset(offset).all()
-        
-        return TicketListResponse(total=total, items=tickets)
-        
+            filters.append(Ticket.category == category)
+
+        stmt = (
+            select(Ticket, func.count().over().label("total"))
+            .where(*filters)
+            .order_by(Ticket.created_at.desc())
+            .limit(limit)
+            .offset(offset)
+        )
+        rows = (await db.execute(stmt)).all()
+
+        if rows:
+            total = rows[0].total
+            tickets = [row[0] for row in rows]
+        else:
+            # Empty page (e.g. offset past the end) — fall back to a count
+            count_stmt = select(func.count()).select_from(Ticket).where(*filters)
+            total = (await db.execute(count_stmt)).scalar_one()
+            tickets = []
+
+        items = TICKET_LIST_ADAPTER.dump_python(
+            TICKET_LIST_ADAPTER.validate_python(tickets, from_attributes=True),
+            mode="json"
+        )
+        return {"total": total, "items": items}
+
     except Exception as e:
-        logger.error(f"Error listing tickets: {e}")
+        logger.error("Error listing tickets: %s", e)
         raise HTTPException(status_code=500, detail=f"Error listing tickets: {str(e)}")
 
 
 @router.get("/{ticket_id}", response_model=TicketResponse)
 async def get_ticket(
     ticket_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db_ro)
 ):
     """
     Get a specific ticket by ID.
     """
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    
+    redis = get_async_redis()
+    cache_key = ticket_cache_key(ticket_id)
+
+    try:
+        cached = await redis.get(cache_key)
+    except Exception as e:
+        logger.warning("Ticket cache read failed: %s", e)
+        cached = None
+
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    # Primary-key fast path: hits the identity map and skips query compilation
+    ticket = await db.get(Ticket, ticket_id)
+
     if not ticket:
         raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
-    
-    return ticket
+
+    body = TICKET_ADAPTER.dump_json(
+        TICKET_ADAPTER.validate_python(ticket, from_attributes=True)
+    )
+
+    try:
+        await redis.set(cache_key, body, ex=TICKET_CACHE_TTL)
+    except Exception as e:
+        logger.warning("Ticket cache write failed: %s", e)
+
+    return Response(content=body, media_type="application/json")
 
 
 @router.patch("/{ticket_id}", response_model=TicketResponse)
 async def update_ticket(
     ticket_id: UUID,
     ticket_update: TicketUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update a ticket (agent editing the draft response or adding notes).
-    
+
     This allows agents to edit the AI-generated draft before resolving.
     """
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    
-    if not ticket:
-        raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
-    
+    # Collect fields if provided
+    values = {}
+    if ticket_update.final_response is not None:
+        values["final_response"] = ticket_update.final_response
+    if ticket_update.agent_notes is not None:
+        values["agent_notes"] = ticket_update.agent_notes
+    values["updated_at"] = func.now()
+
     try:
-        # Update fields if provided
-        if ticket_update.final_response is not None:
-            ticket.final_response = ticket_update.final_response
-        if ticket_update.agent_notes is not None:
-            ticket.agent_notes = ticket_update.agent_notes
-        
-        ticket.updated_at = datetime.utcnow()
-        
-        db.commit()
-        db.refresh(ticket)
-        
-        logger.info(f"✅ Updated ticket {ticket_id}")
-        
-        return ticket
-        
+        # Single UPDATE ... RETURNING round-trip instead of SELECT +
+        # mutate + commit + refresh
+        stmt = (
+            update(Ticket)
+            .where(Ticket.id == ticket_id)
+            .values(**values)
+            .returning(Ticket)
+        )
+        ticket = (await db.execute(stmt)).scalar_one_or_none()
+
+        if ticket is None:
+            await db.rollback()
+        else:
+            await db.commit()
+            await invalidate_ticket_caches(ticket_id)
+            logger.info("✅ Updated ticket %s", ticket_id)
+
     except Exception as e:
-        logger.error(f"Error updating ticket {ticket_id}: {e}")
-        db.rollback()
+        logger.error("Error updating ticket %s: %s", ticket_id, e)
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error updating ticket: {str(e)}")
 
+    if ticket is None:
+        raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
+
+    return ticket
+
 
 @router.post("/{ticket_id}/resolve", response_model=TicketResponse)
 async def resolve_ticket(
     ticket_id: UUID,
     resolve_data: TicketResolve,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Resolve a ticket.
-    
+
     Marks the ticket as resolved with the final response and agent information.
     """
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    
-    if not ticket:
-        raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
-    
-    if ticket.status == TicketStatus.RESOLVED:
-        raise HTTPException(status_code=400, detail="Ticket is already resolved")
-    
     try:
-        # Update ticket with resolution data
-        ticket.final_response = resolve_data.final_response
-        ticket.agent_notes = resolve_data.agent_notes
-        ticket.resolved_by = resolve_data.resolved_by
-        ticket.resolved_at = datetime.utcnow()
-        ticket.status = TicketStatus.RESOLVED
-        ticket.updated_at = datetime.utcnow()
-        
-        db.commit()
-        db.refresh(ticket)
-        
-        logger.info(f"✅ Resolved ticket {ticket_id} by {resolve_data.resolved_by}")
-        
-        return ticket
-        
+        # Single atomic UPDATE ... RETURNING: the status guard in the WHERE
+        # clause closes the race between checking and resolving
+        stmt = (
+            update(Ticket)
+            .where(Ticket.id == ticket_id, Ticket.status != TicketStatus.RESOLVED)
+            .values(
+                final_response=resolve_data.final_response,
+                agent_notes=resolve_data.agent_notes,
+                resolved_by=resolve_data.resolved_by,
+                resolved_at=func.now(),
+                status=TicketStatus.RESOLVED,
+                updated_at=func.now()
+            )
+            .returning(Ticket)
+        )
+        ticket = (await db.execute(stmt)).scalar_one_or_none()
+
+        if ticket is None:
+            await db.rollback()
+        else:
+            await db.commit()
+            await invalidate_ticket_caches(ticket_id)
+            logger.info("✅ Resolved ticket %s by %s", ticket_id, resolve_data.resolved_by)
+
     except Exception as e:
-        logger.error(f"Error resolving ticket {ticket_id}: {e}")
-        db.rollback()
+        logger.error("Error resolving ticket %s: %s", ticket_id, e)
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error resolving ticket: {str(e)}")
 
+    if ticket is None:
+        # Distinguish a missing ticket from one that is already resolved
+        existing = await db.get(Ticket, ticket_id)
+        if not existing:
+            raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
+        raise HTTPException(status_code=400, detail="Ticket is already resolved")
+
+    return ticket
+
 
 @router.delete("/{ticket_id}", status_code=204)
 async def delete_ticket(
     ticket_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a ticket.
-    
+
     **Warning:** This permanently deletes the ticket. Use with caution.
     """
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    
+    # Primary-key fast path: hits the identity map and skips query compilation
+    ticket = await db.get(Ticket, ticket_id)
+
     if not ticket:
         raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
-    
+
     try:
-        db.delete(ticket)
-        db.commit()
-        
-        logger.info(f"🗑️  Deleted ticket {ticket_id}")
-        
+        await db.delete(ticket)
+        await db.commit()
+        await invalidate_ticket_caches(ticket_id)
+
+        logger.info("🗑️  Deleted ticket %s", ticket_id)
+
         return None
-        
+
     except Exception as e:
-        logger.error(f"Error deleting ticket {ticket_id}: {e}")
-        db.rollback()
+        logger.error("Error deleting ticket %s: %s", ticket_id, e)
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting ticket: {str(e)}")
 
 
 @router.get("/stats/summary")
-async def get_ticket_stats(db: Session = Depends(get_db)):
+@cache(expire=60, namespace="tickets", key_builder=query_key_builder)
+async def get_ticket_stats(db: AsyncSession = Depends(get_db_ro)):
     """
     Get ticket statistics summary.
     """
     try:
-        total = db.query(Ticket).count()
-        pending = db.query(Ticket).filter(Ticket.status == TicketStatus.PENDING).count()
-        processing = db.query(Ticket).filter(Ticket.status == TicketStatus.PROCESSING).count()
-        ready = db.query(Ticket).filter(Ticket.status == TicketStatus.READY).count()
-        resolved = db.query(Ticket).filter(Ticket.status == TicketStatus.RESOLVED).count()
-        failed = db.query(Ticket).filter(Ticket.status == TicketStatus.FAILED).count()
-        
-        high_urgency = db.query(Ticket).filter(Ticket.urgency == TicketUrgency.HIGH).count()
-        medium_urgency = db.query(Ticket).filter(Ticket.urgency == TicketUrgency.MEDIUM).count()
-        low_urgency = db.query(Ticket).filter(Ticket.urgency == TicketUrgency.LOW).count()
-        
+        # Two GROUP BY queries instead of nine separate COUNT(*) round-trips
+        status_rows = (await db.execute(
+            select(Ticket.status, func.count()).group_by(Ticket.status)
+        )).all()
+        urgency_rows = (await db.execute(
+            select(Ticket.urgency, func.count())
+            .where(Ticket.urgency.is_not(None))
+            .group_by(Ticket.urgency)
+        )).all()
+
+        by_status = {s.value: 0 for s in TicketStatus}
+        by_status.update({status.value: count for status, count in status_rows})
+
+        by_urgency = {u.value: 0 for u in TicketUrgency}
+        by_urgency.update({urgency.value: count for urgency, count in urgency_rows})
+
         return {
-            "total": total,
-            "by_status": {
-                "pending": pending,
-                "processing": processing,
-                "ready": ready,
-                "resolved": resolved,
-                "failed": failed
-            },
-            "by_urgency": {
-                "high": high_urgency,
-                "medium": medium_urgency,
-                "low": low_urgency
-            }
+            "total": sum(by_status.values()),
+            "by_status": by_status,
+            "by_urgency": by_urgency
         }
     except Exception as e:
-        logger.error(f"Error getting stats: {e}")
+        logger.error("Error getting stats: %s", e)
         raise HTTPException(status_code=500, detail=f"Error getting statistics: {str(e)}")
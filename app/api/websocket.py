@@ -1,58 +1,115 @@
 """WebSocket endpoint for real-time ticket updates"""
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List, Dict
-import json
+from typing import Dict, Optional, Set
+import orjson
 import asyncio
 import logging
 
+import redis
+
+from app.config import get_settings
+from app.utils.redis_client import get_async_redis
+
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 router = APIRouter()
 
+# All ticket events flow through this Redis channel so every API worker
+# (and the Celery workers) can reach every connected client, not just the
+# ones attached to the local process
+TICKET_EVENTS_CHANNEL = "ticket:events"
+
+_sync_redis: Optional[redis.Redis] = None
+
+
+async def publish_ticket_event(payload: bytes):
+    """Publish a ticket event for all API workers to fan out"""
+    await get_async_redis().publish(TICKET_EVENTS_CHANNEL, payload)
+
+
+def publish_ticket_event_sync(payload: bytes):
+    """Publish a ticket event from sync code (Celery workers)"""
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = redis.Redis.from_url(settings.REDIS_URL)
+    _sync_redis.publish(TICKET_EVENTS_CHANNEL, payload)
+
+
+async def redis_listener():
+    """
+    Background task (started in the app lifespan) that subscribes to the
+    ticket events channel and fans each message out to this worker's
+    local WebSocket connections.
+    """
+    pubsub = get_async_redis().pubsub()
+
+    try:
+        await pubsub.subscribe(TICKET_EVENTS_CHANNEL)
+        logger.info("Subscribed to Redis channel '%s'", TICKET_EVENTS_CHANNEL)
+
+        async for message in pubsub.listen():
+            if message["type"] != "message":
+                continue
+            try:
+                # Decode once; clients expect text frames (JSON.parse on
+                # event.data), so broadcasts must not switch to binary
+                await manager.broadcast(message["data"].decode())
+            except Exception as e:
+                logger.error("Error fanning out ticket event: %s", e)
+    except asyncio.CancelledError:
+        await pubsub.unsubscribe(TICKET_EVENTS_CHANNEL)
+        raise
+    except Exception as e:
+        logger.error("Redis listener stopped: %s", e)
+
 
 class ConnectionManager:
     """Manages WebSocket connections"""
-    
+
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-    
+        self.active_connections: Set[WebSocket] = set()
+
     async def connect(self, websocket: WebSocket):
         """Accept and store a new WebSocket connection"""
         await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"New WebSocket connection. Total connections: {len(self.active_connections)}")
-    
+        self.active_connections.add(websocket)
+        logger.info("New WebSocket connection. Total connections: %d", len(self.active_connections))
+
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
-    
+        self.active_connections.discard(websocket)
+        logger.info("WebSocket disconnected. Total connections: %d", len(self.active_connections))
+
     async def send_personal_message(self, message: str, websocket: WebSocket):
         """Send a message to a specific connection"""
         try:
             await websocket.send_text(message)
         except Exception as e:
-            logger.error(f"Error sending personal message: {e}")
-    
+            logger.error("Error sending personal message: %s", e)
+
     async def broadcast(self, message: str):
-        """Broadcast a message to all connected clients"""
-        disconnected = []
-        
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to connection: {e}")
-                disconnected.append(connection)
-        
-        # Remove disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
-        
+        """Broadcast a pre-serialized message to all connected clients concurrently"""
+        if not self.active_connections:
+            return
+
+        # Snapshot so connects/disconnects during the send don't mutate
+        # the set we're iterating; sends overlap instead of running serially
+        connections = tuple(self.active_connections)
+        results = await asyncio.gather(
+            *(connection.send_text(message) for connection in connections),
+            return_exceptions=True
+        )
+
+        # Remove clients whose send failed
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error("Error broadcasting to connection: %s", result)
+                self.disconnect(connection)
+
         if self.active_connections:
-            logger.info(f"Broadcasted message to {len(self.active_connections)} clients")
+            logger.info("Broadcasted message to %d clients", len(self.active_connections))
 
 
 # Global connection manager
@@ -102,13 +159,13 @@ async def websocket_endpoint(websocket: WebSocket):
             except WebSocketDisconnect:
                 break
             except Exception as e:
-                logger.error(f"Error in WebSocket loop: {e}")
+                logger.error("Error in WebSocket loop: %s", e)
                 break
     
     except WebSocketDisconnect:
         logger.info("Client disconnected normally")
     except Exception as e:
-        logger.error(f"WebSocket error: {e}")
+        logger.error("WebSocket error: %s", e)
     finally:
         manager.disconnect(websocket)
 
@@ -124,36 +181,37 @@ async def broadcast_ticket_update(ticket_id: str, status: str, data: Dict = None
         status: New status of the ticket
         data: Optional additional data about the ticket
     """
-    message = {
+    # Encode once per broadcast, not per client
+    payload = orjson.dumps({
         "type": "ticket_update",
         "ticket_id": ticket_id,
         "status": status,
         "timestamp": asyncio.get_event_loop().time(),
         "data": data or {}
-    }
-    
-    await manager.broadcast(json.dumps(message))
+    })
+
+    await publish_ticket_event(payload)
 
 
 async def broadcast_ticket_created(ticket_id: str, title: str):
     """Broadcast notification when a new ticket is created"""
-    message = {
+    payload = orjson.dumps({
         "type": "ticket_created",
         "ticket_id": ticket_id,
         "title": title,
         "timestamp": asyncio.get_event_loop().time()
-    }
-    
-    await manager.broadcast(json.dumps(message))
+    })
+
+    await publish_ticket_event(payload)
 
 
 async def broadcast_ticket_resolved(ticket_id: str, resolved_by: str):
     """Broadcast notification when a ticket is resolved"""
-    message = {
+    payload = orjson.dumps({
         "type": "ticket_resolved",
         "ticket_id": ticket_id,
         "resolved_by": resolved_by,
         "timestamp": asyncio.get_event_loop().time()
-    }
-    
-    await manager.broadcast(json.dumps(message))
+    })
+
+    await publish_ticket_event(payload)
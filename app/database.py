@@ -1,14 +1,33 @@
 """Database connection and session management"""
 
 from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker, Session
+from typing import AsyncGenerator, Generator
 from app.config import get_settings
 
 settings = get_settings()
 
-# Create database engine
+# Async database URL (asyncpg driver) derived from the standard URL
+ASYNC_DATABASE_URL = settings.DATABASE_URL.replace(
+    "postgresql://", "postgresql+asyncpg://", 1
+)
+
+# Async engine for the FastAPI request path (non-blocking I/O).
+# SQLAlchemy automatically selects AsyncAdaptedQueuePool for async engines.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,  # Fail fast on pool exhaustion
+    pool_pre_ping=True,  # Verify connections before using
+    pool_recycle=settings.DB_POOL_RECYCLE,  # Survive PG idle timeouts / LB resets
+    pool_use_lifo=True,  # Better connection cache locality on Postgres
+    connect_args={"server_settings": {"tcp_keepalives_idle": "60"}},
+    echo=settings.DEBUG,  # Log SQL queries in debug mode
+)
+
+# Sync engine kept for Celery workers and scripts (they run outside the event loop)
 engine = create_engine(
     settings.DATABASE_URL,
     pool_size=10,
@@ -18,22 +37,66 @@ engine = create_engine(
     echo=settings.DEBUG,  # Log SQL queries in debug mode
 )
 
-# Create session factory
+# Optional read replica: route read-only traffic away from the primary
+if settings.DATABASE_REPLICA_URL:
+    read_engine = create_async_engine(
+        settings.DATABASE_REPLICA_URL.replace(
+            "postgresql://", "postgresql+asyncpg://", 1
+        ),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_use_lifo=True,
+        connect_args={"server_settings": {"tcp_keepalives_idle": "60"}},
+        echo=settings.DEBUG,
+    )
+else:
+    read_engine = async_engine
+
+# Session factories
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=read_engine, autoflush=False, expire_on_commit=False
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Base class for declarative models
 Base = declarative_base()
 
 
-def get_db() -> Generator[Session, None, None]:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Dependency function for FastAPI to get database session.
-    
+    Dependency function for FastAPI to get an async database session.
+
     Usage:
         @app.get("/items/")
-        def read_items(db: Session = Depends(get_db)):
-            return db.query(Item).all()
+        async def read_items(db: AsyncSession = Depends(get_db)):
+            result = await db.execute(select(Item))
+            return result.scalars().all()
     """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_db_ro() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function for read-only GET endpoints.
+
+    Opens the transaction READ ONLY (and against the replica when
+    DATABASE_REPLICA_URL is configured) so read traffic can be routed
+    off the primary.
+    """
+    async with AsyncReadSessionLocal() as db:
+        await db.connection(execution_options={"postgresql_readonly": True})
+        yield db
+
+
+def get_sync_db() -> Generator[Session, None, None]:
+    """Get a synchronous database session (for Celery workers and scripts)"""
     db = SessionLocal()
     try:
         yield db
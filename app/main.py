@@ -2,12 +2,18 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from redis import asyncio as aioredis
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 from datetime import datetime
 
 from app.config import get_settings
 from app.api import tickets, websocket
+from app.api.websocket import redis_listener
 from app.database import engine, Base
 from app.schemas import HealthResponse
 
@@ -45,10 +51,27 @@ async def lifespan(app: FastAPI):
         logger.info("✅ Database tables verified/created")
     except Exception as e:
         logger.error(f"❌ Error creating database tables: {e}")
-    
+
+    # Initialize Redis-backed response cache
+    FastAPICache.init(
+        RedisBackend(aioredis.from_url(settings.REDIS_URL)),
+        prefix="fastapi-cache"
+    )
+    logger.info("✅ Response cache initialized")
+
+    # Subscribe this worker to the ticket events channel so broadcasts
+    # reach clients on every API process
+    listener_task = asyncio.create_task(redis_listener())
+
     yield
-    
+
     # Shutdown
+    listener_task.cancel()
+    try:
+        await listener_task
+    except asyncio.CancelledError:
+        pass
+
     logger.info("=" * 60)
     logger.info("👋 Shutting down Complaint Triage System API")
     logger.info("=" * 60)
@@ -60,13 +83,14 @@ app = FastAPI(
     description="AI-powered complaint triage system with async processing",
     version="1.0.0",
     debug=settings.DEBUG,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.cors_origins_list,
+    allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -116,14 +140,20 @@ async def api_info():
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    
+
     logger.info("Starting development server...")
-    
+
+    # uvloop/httptools are Linux/macOS only; fall back on Windows dev boxes
+    on_windows = sys.platform == "win32"
+
     uvicorn.run(
         "app.main:app",
         host=settings.API_HOST,
         port=settings.API_PORT,
         reload=settings.DEBUG,
-        log_level=settings.LOG_LEVEL.lower()
+        log_level=settings.LOG_LEVEL.lower(),
+        loop="asyncio" if on_windows else "uvloop",
+        http="auto" if on_windows else "httptools"
     )
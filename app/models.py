@@ -1,8 +1,8 @@
 """SQLAlchemy models for database tables"""
 
-from sqlalchemy import Column, String, Integer, Text, DateTime, CheckConstraint, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, Text, DateTime, CheckConstraint, Index, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
-from datetime import datetime
+from sqlalchemy.sql import func
 import uuid
 import enum
 
@@ -32,6 +32,17 @@ class TicketStatus(str, enum.Enum):
     FAILED = "failed"            # Processing failed
 
 
+def _ticket_enum(enum_cls):
+    """Enum column type that stores member values and skips per-row
+    string validation on read (values are constrained by the DB type)"""
+    return SQLEnum(
+        enum_cls,
+        native_enum=True,
+        values_callable=lambda x: [e.value for e in x],
+        validate_strings=False
+    )
+
+
 class Ticket(Base):
     """Main tickets table"""
     __tablename__ = "tickets"
@@ -46,9 +57,9 @@ class Ticket(Base):
     customer_name = Column(String(100), nullable=True)
     
     # AI-Generated Fields
-    category = Column(SQLEnum(TicketCategory), nullable=True)
+    category = Column(_ticket_enum(TicketCategory), nullable=True)
     sentiment_score = Column(Integer, nullable=True)
-    urgency = Column(SQLEnum(TicketUrgency), nullable=True)
+    urgency = Column(_ticket_enum(TicketUrgency), nullable=True)
     ai_draft_response = Column(Text, nullable=True)
     
     # Agent Fields
@@ -58,13 +69,14 @@ class Ticket(Base):
     resolved_at = Column(DateTime(timezone=True), nullable=True)
     
     # Status Tracking Fields
-    status = Column(SQLEnum(TicketStatus), nullable=False, default=TicketStatus.PENDING)
+    status = Column(_ticket_enum(TicketStatus), nullable=False, default=TicketStatus.PENDING)
     error_message = Column(Text, nullable=True)
     processing_attempts = Column(Integer, nullable=False, default=0)
     
-    # Metadata Fields
-    created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
-    updated_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Metadata Fields (timestamps generated by Postgres, not Python, so
+    # the clock source stays consistent across app replicas)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
     
     # Constraints
     __table_args__ = (
@@ -84,30 +96,41 @@ class Ticket(Base):
             "TRIM(description) != ''",
             name='non_empty_description'
         ),
+        # Composite indexes matching the list query's filter + ORDER BY
+        # created_at DESC; INCLUDE (id) enables index-only scans
+        Index(
+            'ix_tickets_status_created',
+            status, created_at.desc(),
+            postgresql_include=['id']
+        ),
+        Index(
+            'ix_tickets_urgency_created',
+            urgency, created_at.desc(),
+            postgresql_include=['id']
+        ),
+        Index(
+            'ix_tickets_category_created',
+            category, created_at.desc(),
+            postgresql_include=['id']
+        ),
     )
     
     def __repr__(self):
         return f"<Ticket(id={self.id}, title='{self.title[:30]}...', status={self.status})>"
     
+    # Cached TicketResponse adapter, resolved lazily because app.schemas
+    # imports this module
+    _response_adapter = None
+
     def to_dict(self):
-        """Convert model to dictionary"""
-        return {
-            "id": str(self.id),
-            "title": self.title,
-            "description": self.description,
-            "customer_email": self.customer_email,
-            "customer_name": self.customer_name,
-            "category": self.category.value if self.category else None,
-            "sentiment_score": self.sentiment_score,
-            "urgency": self.urgency.value if self.urgency else None,
-            "ai_draft_response": self.ai_draft_response,
-            "final_response": self.final_response,
-            "agent_notes": self.agent_notes,
-            "resolved_by": self.resolved_by,
-            "resolved_at": self.resolved_at.isoformat() if self.resolved_at else None,
-            "status": self.status.value,
-            "error_message": self.error_message,
-            "processing_attempts": self.processing_attempts,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }
+        """Convert model to a JSON-safe dictionary via the compiled
+        TicketResponse adapter (pydantic-core handles enums/datetimes)"""
+        cls = type(self)
+        if cls._response_adapter is None:
+            from app.schemas import TICKET_ADAPTER
+            cls._response_adapter = TICKET_ADAPTER
+        adapter = cls._response_adapter
+        return adapter.dump_python(
+            adapter.validate_python(self, from_attributes=True),
+            mode="json"
+        )
@@ -1,6 +1,6 @@
 """Pydantic schemas for request/response validation"""
 
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, TypeAdapter
 from typing import Optional
 from datetime import datetime
 from uuid import UUID
@@ -10,6 +10,8 @@ from app.models import TicketCategory, TicketUrgency, TicketStatus
 # Request Schemas
 class TicketCreate(BaseModel):
     """Schema for creating a new ticket"""
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
     title: str = Field(..., min_length=5, max_length=255, description="Ticket title")
     description: str = Field(..., min_length=10, description="Detailed description of the complaint")
     customer_email: EmailStr = Field(..., description="Customer email address")
@@ -18,12 +20,16 @@ class TicketCreate(BaseModel):
 
 class TicketUpdate(BaseModel):
     """Schema for updating a ticket (agent editing draft)"""
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
     final_response: Optional[str] = Field(None, description="Final response to customer")
     agent_notes: Optional[str] = Field(None, description="Internal notes from agent")
 
 
 class TicketResolve(BaseModel):
     """Schema for resolving a ticket"""
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
     final_response: str = Field(..., min_length=10, description="Final response to customer")
     agent_notes: Optional[str] = Field(None, description="Internal notes from agent")
     resolved_by: str = Field(..., min_length=2, max_length=100, description="Name of agent resolving the ticket")
@@ -76,3 +82,15 @@ class HealthResponse(BaseModel):
     status: str
     timestamp: datetime
     version: str = "1.0.0"
+
+
+# Precompiled adapter for serializing single tickets (cached GET path)
+TICKET_ADAPTER: TypeAdapter = TypeAdapter(TicketResponse)
+
+# Precompiled adapter for serializing list pages (up to 500 rows) without
+# going through FastAPI's generic response-model path
+TICKET_LIST_ADAPTER: TypeAdapter = TypeAdapter(list[TicketResponse])
+
+# Precompiled adapter for validating ticket payloads outside FastAPI's
+# dependency layer (e.g. bulk ingest)
+TICKET_CREATE_ADAPTER: TypeAdapter = TypeAdapter(TicketCreate)
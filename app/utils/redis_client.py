@@ -0,0 +1,42 @@
+"""Shared Redis client helpers"""
+
+from typing import Optional
+
+import redis
+from redis import asyncio as aioredis
+
+from app.config import get_settings
+
+settings = get_settings()
+
+_async_redis: Optional[aioredis.Redis] = None
+_sync_redis: Optional[redis.Redis] = None
+
+
+def get_async_redis() -> aioredis.Redis:
+    """Get the process-wide async Redis client (created lazily)"""
+    global _async_redis
+    if _async_redis is None:
+        _async_redis = aioredis.from_url(settings.REDIS_URL)
+    return _async_redis
+
+
+def get_sync_redis() -> redis.Redis:
+    """Get the process-wide sync Redis client (created lazily).
+
+    For code that runs outside the event loop, e.g. Celery tasks.
+    """
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = redis.Redis.from_url(settings.REDIS_URL)
+    return _sync_redis
+
+
+def ticket_cache_key(ticket_id) -> str:
+    """Cache key for a single serialized ticket response.
+
+    Shared between the API (read-through cache on GET /tickets/{id})
+    and the Celery workers, which must invalidate the key whenever they
+    change a ticket's status.
+    """
+    return f"ticket:{ticket_id}"
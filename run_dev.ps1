@@ -37,7 +37,9 @@ Write-Host '🔧 Celery Worker' -ForegroundColor Cyan
 Write-Host ''
 Set-Location '$PWD'
 & 'venv\Scripts\Activate.ps1'
-celery -A app.workers.celery_worker worker --loglevel=info --pool=solo
+# I/O-bound AI tasks: gevent pool overlaps the Claude calls.
+# If gevent misbehaves on Windows, fall back to --pool=solo
+celery -A app.workers.celery_worker worker --loglevel=info --pool=gevent --concurrency=200
 "@
 
 $celeryBlock = [ScriptBlock]::Create($celeryScript)
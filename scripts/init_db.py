@@ -5,10 +5,12 @@ This script creates the database and runs the schema.
 """
 
 import os
+import re
 import sys
 from pathlib import Path
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from psycopg2.pool import ThreadedConnectionPool
 from dotenv import load_dotenv
 
 # Add parent directory to path
@@ -47,8 +49,78 @@ def create_database():
     cursor.close()
     conn.close()
 
-def run_schema():
-    """Run the database schema."""
+# Opening tag of a dollar-quoted block, e.g. $$ or $body$
+_DOLLAR_TAG_RE = re.compile(r'\$[A-Za-z_]\w*\$|\$\$')
+
+def split_sql_statements(sql):
+    """Split a SQL script into individual statements.
+
+    Splits on top-level semicolons while skipping string literals,
+    comments, and $$-quoted function bodies, so trigger functions in the
+    schema stay intact.
+    """
+    statements = []
+    start = 0
+    i = 0
+    n = len(sql)
+    dollar_tag = None
+
+    while i < n:
+        ch = sql[i]
+
+        if dollar_tag:
+            if ch == '$' and sql.startswith(dollar_tag, i):
+                i += len(dollar_tag)
+                dollar_tag = None
+            else:
+                i += 1
+            continue
+
+        if ch == "'":  # string literal ('' is an escaped quote)
+            i += 1
+            while i < n:
+                if sql[i] == "'":
+                    if sql[i + 1:i + 2] == "'":
+                        i += 2
+                        continue
+                    i += 1
+                    break
+                i += 1
+            continue
+
+        if ch == '-' and sql[i + 1:i + 2] == '-':  # line comment
+            j = sql.find('\n', i)
+            i = n if j == -1 else j + 1
+            continue
+
+        if ch == '/' and sql[i + 1:i + 2] == '*':  # block comment
+            j = sql.find('*/', i + 2)
+            i = n if j == -1 else j + 2
+            continue
+
+        if ch == '$':
+            match = _DOLLAR_TAG_RE.match(sql, i)
+            if match:
+                dollar_tag = match.group(0)
+                i = match.end()
+                continue
+
+        if ch == ';':
+            statement = sql[start:i].strip()
+            if statement:
+                statements.append(statement)
+            start = i + 1
+
+        i += 1
+
+    tail = sql[start:].strip()
+    if tail:
+        statements.append(tail)
+
+    return statements
+
+def get_database_url():
+    """Build the database URL from the environment."""
     db_url = os.getenv("DATABASE_URL")
     if not db_url:
         db_name = os.getenv("DB_NAME", "complaint_triage")
@@ -57,11 +129,13 @@ def run_schema():
         db_host = os.getenv("DB_HOST", "localhost")
         db_port = os.getenv("DB_PORT", "5432")
         db_url = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    
-    # Connect to the database
-    conn = psycopg2.connect(db_url)
+    return db_url
+
+def run_schema(pool):
+    """Run the database schema."""
+    conn = pool.getconn()
     cursor = conn.cursor()
-    
+
     # Read schema file
     schema_path = Path(__file__).parent.parent.parent / "database_schema.sql"
     
@@ -74,10 +148,14 @@ def run_schema():
     try:
         with open(schema_path, 'r', encoding='utf-8') as f:
             schema_sql = f.read()
-        
-        cursor.execute(schema_sql)
+
+        # Execute statement by statement instead of one giant string, so
+        # psycopg2 doesn't parse-and-prepare the whole file as a unit
+        statements = split_sql_statements(schema_sql)
+        for statement in statements:
+            cursor.execute(statement)
         conn.commit()
-        print("✅ Schema executed successfully!")
+        print(f"✅ Schema executed successfully! ({len(statements)} statements)")
         
         # Verify tables created
         cursor.execute("""
@@ -100,78 +178,71 @@ def run_schema():
         return False
     finally:
         cursor.close()
-        conn.close()
+        pool.putconn(conn)
 
-def verify_setup():
+def verify_setup(pool):
     """Verify the database setup."""
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        db_name = os.getenv("DB_NAME", "complaint_triage")
-        db_user = os.getenv("DB_USER", "postgres")
-        db_password = os.getenv("DB_PASSWORD", "postgres")
-        db_host = os.getenv("DB_HOST", "localhost")
-        db_port = os.getenv("DB_PORT", "5432")
-        db_url = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    
-    conn = psycopg2.connect(db_url)
+    conn = pool.getconn()
     cursor = conn.cursor()
-    
+
     print("\n🔍 Verification:")
-    
-    # Check ENUM types
+
+    # Single round-trip: the enum/index/view checks are combined into one
+    # UNION ALL query and partitioned by kind in Python
     cursor.execute("""
-        SELECT typname FROM pg_type 
+        SELECT 'enum' AS kind, typname AS name
+        FROM pg_type
         WHERE typname IN ('ticket_category', 'ticket_urgency', 'ticket_status')
-        ORDER BY typname
+        UNION ALL
+        SELECT 'index', indexname
+        FROM pg_indexes
+        WHERE schemaname = 'public' AND tablename = 'tickets'
+        UNION ALL
+        SELECT 'view', table_name
+        FROM information_schema.views
+        WHERE table_schema = 'public'
+        ORDER BY kind, name
     """)
-    enums = cursor.fetchall()
+    rows = cursor.fetchall()
+
+    enums = [name for kind, name in rows if kind == 'enum']
+    indexes = [name for kind, name in rows if kind == 'index']
+    views = [name for kind, name in rows if kind == 'view']
+
     print(f"\n✅ ENUM types created: {len(enums)}")
     for enum in enums:
-        print(f"  - {enum[0]}")
-    
-    # Check indexes
-    cursor.execute("""
-        SELECT indexname 
-        FROM pg_indexes 
-        WHERE schemaname = 'public' AND tablename = 'tickets'
-        ORDER BY indexname
-    """)
-    indexes = cursor.fetchall()
+        print(f"  - {enum}")
+
     print(f"\n✅ Indexes created: {len(indexes)}")
     for idx in indexes[:5]:  # Show first 5
-        print(f"  - {idx[0]}")
+        print(f"  - {idx}")
     if len(indexes) > 5:
         print(f"  ... and {len(indexes) - 5} more")
-    
-    # Check views
-    cursor.execute("""
-        SELECT table_name 
-        FROM information_schema.views 
-        WHERE table_schema = 'public'
-        ORDER BY table_name
-    """)
-    views = cursor.fetchall()
+
     print(f"\n✅ Views created: {len(views)}")
     for view in views:
-        print(f"  - {view[0]}")
-    
+        print(f"  - {view}")
+
     cursor.close()
-    conn.close()
+    pool.putconn(conn)
 
 if __name__ == "__main__":
     print("=" * 60)
     print("🚀 Complaint Triage System - Database Setup")
     print("=" * 60)
     
+    pool = None
     try:
-        # Step 1: Create database
+        # Step 1: Create database (dedicated AUTOCOMMIT connection to the
+        # server — the pool below targets the application database)
         create_database()
-        
-        # Step 2: Run schema
-        if run_schema():
-            # Step 3: Verify setup
-            verify_setup()
-            
+
+        # Step 2 & 3 check connections out of a shared pool instead of
+        # opening fresh ones per function
+        pool = ThreadedConnectionPool(1, 4, dsn=get_database_url())
+        if run_schema(pool):
+            verify_setup(pool)
+
             print("\n" + "=" * 60)
             print("✅ Database setup completed successfully!")
             print("=" * 60)
@@ -186,3 +257,6 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"\n❌ Error during setup: {e}")
         sys.exit(1)
+    finally:
+        if pool is not None:
+            pool.closeall()
@@ -97,7 +97,8 @@ Write-Host "   redis-server" -ForegroundColor Gray
 Write-Host "   # OR use Docker: docker run -d -p 6379:6379 redis:7-alpine" -ForegroundColor Gray
 Write-Host ""
 Write-Host "5. Start Celery worker (in a separate terminal):" -ForegroundColor White
-Write-Host "   celery -A app.workers.celery_worker worker --loglevel=info --pool=solo" -ForegroundColor Gray
+Write-Host "   celery -A app.workers.celery_worker worker --loglevel=info --pool=gevent --concurrency=200" -ForegroundColor Gray
+Write-Host "   # If gevent misbehaves on Windows, fall back to --pool=solo" -ForegroundColor Gray
 Write-Host ""
 Write-Host "6. Start FastAPI server:" -ForegroundColor White
 Write-Host "   uvicorn app.main:app --reload" -ForegroundColor Gray
@@ -0,0 +1,18 @@
+"""Shared pytest fixtures"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Session-scoped test client.
+
+    Entering the client as a context manager runs the app lifespan, so
+    startup/shutdown (cache init, Redis listener) happen once for the
+    whole suite instead of never or per test.
+    """
+    with TestClient(app) as test_client:
+        yield test_client
@@ -1,13 +1,14 @@
 """Basic tests for the API"""
 
+import asyncio
+
+import httpx
 import pytest
-from fastapi.testclient import TestClient
-from app.main import app
 
-client = TestClient(app)
+from app.main import app
 
 
-def test_read_root():
+def test_read_root(client):
     """Test root endpoint"""
     response = client.get("/")
     assert response.status_code == 200
@@ -15,7 +16,7 @@ def test_read_root():
     assert "version" in response.json()
 
 
-def test_health_check():
+def test_health_check(client):
     """Test health check endpoint"""
     response = client.get("/health")
     assert response.status_code == 200
@@ -25,7 +26,7 @@ def test_health_check():
     assert "version" in data
 
 
-def test_api_info():
+def test_api_info(client):
     """Test API info endpoint"""
     response = client.get("/api/info")
     assert response.status_code == 200
@@ -35,7 +36,7 @@ def test_api_info():
     assert "endpoints" in data
 
 
-def test_create_ticket():
+def test_create_ticket(client):
     """Test ticket creation (non-blocking)"""
     import time
     
@@ -68,7 +69,7 @@ def test_create_ticket():
     return data["id"]
 
 
-def test_list_tickets():
+def test_list_tickets(client):
     """Test listing tickets"""
     response = client.get("/api/tickets/")
     assert response.status_code == 200
@@ -78,7 +79,7 @@ def test_list_tickets():
     assert isinstance(data["items"], list)
 
 
-def test_get_ticket_stats():
+def test_get_ticket_stats(client):
     """Test ticket statistics"""
     response = client.get("/api/tickets/stats/summary")
     assert response.status_code == 200
@@ -88,14 +89,14 @@ def test_get_ticket_stats():
     assert "by_urgency" in data
 
 
-def test_get_nonexistent_ticket():
+def test_get_nonexistent_ticket(client):
     """Test getting a ticket that doesn't exist"""
     fake_uuid = "00000000-0000-0000-0000-000000000000"
     response = client.get(f"/api/tickets/{fake_uuid}")
     assert response.status_code == 404
 
 
-def test_create_ticket_invalid_email():
+def test_create_ticket_invalid_email(client):
     """Test creating ticket with invalid email"""
     ticket_data = {
         "title": "Test ticket",
@@ -107,7 +108,7 @@ def test_create_ticket_invalid_email():
     assert response.status_code == 422  # Validation error
 
 
-def test_create_ticket_missing_fields():
+def test_create_ticket_missing_fields(client):
     """Test creating ticket with missing required fields"""
     ticket_data = {
         "title": "Test"  # Missing description and email
@@ -117,5 +118,18 @@ def test_create_ticket_missing_fields():
     assert response.status_code == 422  # Validation error
 
 
+@pytest.mark.asyncio
+async def test_concurrent_info_probes():
+    """Test root, health and info endpoints served concurrently"""
+    async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+        responses = await asyncio.gather(
+            async_client.get("/"),
+            async_client.get("/health"),
+            async_client.get("/api/info"),
+        )
+
+    assert all(response.status_code == 200 for response in responses)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
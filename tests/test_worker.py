@@ -0,0 +1,98 @@
+"""Tests for the Celery worker's database paths"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Ticket, TicketCategory, TicketStatus, TicketUrgency
+from app.workers.celery_worker import _apply_batch_results
+
+
+@pytest.fixture()
+def db():
+    """In-memory SQLite session with the tickets schema created"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _make_ticket(db, title):
+    ticket = Ticket(
+        title=title,
+        description="Something went wrong and needs a look",
+        customer_email="customer@example.com",
+        status=TicketStatus.PROCESSING,
+        processing_attempts=1,
+    )
+    db.add(ticket)
+    db.commit()
+    return ticket
+
+
+def test_apply_batch_results_marks_tickets_ready(db):
+    """The batch apply path must update every analyzed ticket"""
+    first = _make_ticket(db, "First ticket title")
+    second = _make_ticket(db, "Second ticket title")
+
+    _apply_batch_results(db, {
+        str(first.id): {
+            "category": "billing",
+            "sentiment_score": 3,
+            "urgency": "high",
+            "draft_response": "We are sorry about the charge and are on it.",
+        },
+        str(second.id): {
+            "category": "technical",
+            "sentiment_score": 6,
+            "urgency": "low",
+            "draft_response": "Thanks for the report, we will investigate.",
+        },
+    })
+    db.commit()
+    db.expire_all()
+
+    assert first.status is TicketStatus.READY
+    assert first.category is TicketCategory.BILLING
+    assert first.urgency is TicketUrgency.HIGH
+    assert first.sentiment_score == 3
+    assert first.ai_draft_response.startswith("We are sorry")
+
+    assert second.status is TicketStatus.READY
+    assert second.category is TicketCategory.TECHNICAL
+    assert second.urgency is TicketUrgency.LOW
+
+
+def test_apply_batch_results_only_touches_analyzed_tickets(db):
+    """Tickets absent from the results mapping must stay untouched"""
+    analyzed = _make_ticket(db, "Analyzed ticket title")
+    skipped = _make_ticket(db, "Skipped ticket title")
+
+    _apply_batch_results(db, {
+        str(analyzed.id): {
+            "category": "feature_request",
+            "sentiment_score": 7,
+            "urgency": "low",
+            "draft_response": "Thanks for the suggestion, passing it on.",
+        },
+    })
+    db.commit()
+    db.expire_all()
+
+    assert analyzed.status is TicketStatus.READY
+    assert skipped.status is TicketStatus.PROCESSING
+    assert skipped.category is None
+
+
+def test_apply_batch_results_with_no_results_is_a_noop(db):
+    """An empty results mapping must not execute anything"""
+    ticket = _make_ticket(db, "Untouched ticket title")
+
+    _apply_batch_results(db, {})
+    db.commit()
+    db.expire_all()
+
+    assert ticket.status is TicketStatus.PROCESSING